@@ -905,16 +905,76 @@ my_df = pd.DataFrame({
 df = pd.read_csv("/somedirectory/csv")
 df.to_csv("name of the csv file.csv")
 
+# read_csv() loads the whole file into memory. For files bigger than your RAM,
+# use chunksize to get an iterator of smaller DataFrames instead, and process
+# (and write) them one at a time. Peak memory is then bounded by chunksize
+total, count = 0, 0
+for i, chunk in enumerate(pd.read_csv("/somedirectory/csv", chunksize=100000)):
+    filtered = chunk[(chunk["Column2"] >= 2) & chunk["Column1"].isin(["Row2", "Row3"])]
+    # mode="a" appends each chunk, writing the header only once
+    filtered.to_csv("filtered.csv", mode="w" if i == 0 else "a", header=(i == 0))
+    # Aggregates like the mean can be combined chunk by chunk
+    total += filtered["Column2"].sum()
+    count += filtered["Column2"].count()
+# Mean of Column2 in the filtered rows, without loading the whole file. Check
+# for zero first, because there may be no rows left after filtering
+mean = total / count if count else None
+
 # Read from/Write to Excel
 df2 = pd.read_excel("/somedirectory/excel")
 df2.to_xlsx("name of the excel file.xlsx")
 
+# Parsing CSV and Excel files is slow. If you load the same file often, save
+# it once in a binary columnar format such as Parquet or Feather (requires
+# pip install pyarrow), which loads much faster
+import glob
+import os
+from pyarrow import feather
+
+# The reader is a parameter, e.g. pd.read_csv or pd.read_excel
+def load_cached(path, reader):
+    # The cache is only valid while the original file is unchanged
+    stat = os.stat(path)
+    cache_path = "{}.{}-{}.feather".format(path, stat.st_mtime_ns, stat.st_size)
+    if os.path.exists(cache_path):
+        # Cache hit. Memory-mapping reads the file only as it is accessed
+        return feather.read_feather(cache_path, memory_map=True)
+    # Cache miss: delete the caches of older versions of the file first.
+    # glob.escape() makes sure characters like [ or * in path are not patterns
+    for old_cache_path in glob.glob(glob.escape(path) + ".*-*.feather"):
+        os.remove(old_cache_path)
+    df = reader(path)
+    df.to_feather(cache_path)  # Also df.to_parquet("file.parquet")
+    return df
+
+df = load_cached("/somedirectory/csv", pd.read_csv)
+df2 = load_cached("/somedirectory/excel", pd.read_excel)  # Slow only once
+
 # Adding new columns
 my_df['Column3'] = [some_value, some_other_value]
 
 # Simple way to write a new column derived from others
 my_df["Column7"] = [int(row[1]["Column1"] and row[1]["Column2"]) for row in my_df.iterrows()]
 
+# However, iterrows() builds a whole Series for every row, which makes it
+# very slow on big DataFrames. Operating on entire columns at once
+# (vectorization) gives the same values many times faster. Remember that
+# "x and y" returns y when x is truthy, so Column7 is Column2's value in the
+# rows where Column1 is truthy, and 0 in the rest. where() does exactly that:
+my_df["Column7"] = my_df["Column2"].where(my_df["Column1"].astype(bool), 0).astype(int)
+
+# eval() lets you write the same column expression as a string, which
+# pandas can evaluate in one pass without temporary columns
+my_df["Column8"] = my_df.eval("Column2 * 2 + 1")
+
+# You can check the difference yourself with the timeit module
+import timeit
+big_df = pd.DataFrame({"Column1": ["Row"] * 10**5, "Column2": range(10**5)})
+timeit.timeit(lambda: [int(row[1]["Column1"] and row[1]["Column2"])
+                       for row in big_df.iterrows()], number=1)   # => ~4 s
+timeit.timeit(lambda: big_df["Column2"].where(big_df["Column1"].astype(bool), 0)
+                                      .astype(int), number=1)     # => ~0.01 s
+
 # describe() is useful to get a quick glance at the data
 # it will provide several metrics (count, mean, std, min, max...)
 df.describe()
@@ -957,12 +1017,49 @@ df.iloc[:, 0:4] # All rows, only the first 3 columns
 # Unique finds each individual value
 df["Column2"].unique()  # => 1,2,3
 
+# Columns of Python strings are stored as "object" dtype, and whole numbers as
+# int64. When a column has few unique values, the "category" dtype stores each
+# value only once, and numbers can be downcast to smaller types
+def optimize_memory(df):
+    before = df.memory_usage(deep=True).sum()
+    df = df.copy()
+    for column in df.columns:
+        # Depending on the version of pandas, strings are "object" or "string"
+        is_text = (pd.api.types.is_object_dtype(df[column])
+                   or pd.api.types.is_string_dtype(df[column]))
+        if is_text and df[column].nunique() < len(df) / 2:
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="float")
+    after = df.memory_usage(deep=True).sum()
+    print("{} bytes => {} bytes".format(before, after))
+    return df
+
+small_df = optimize_memory(df)  # Often several times smaller
+# But be careful: downcast integers silently wrap around when they overflow.
+# e.g. Column2 becomes int8 (-128 to 127), so small_df["Column2"] * 100 gives
+# [100, -56, 44]. Keep the original, or cast back with astype("int64")
+# before doing arithmetic that may produce bigger values
+
 #Filtering by value can also be done
 df["Column2"] >= 2  # => 2, 3
 df1 = df[df["Column2"] >= 2]
 df1 = df[df.column2.isin([1, 4])] # Multiple explicit values for one column
 df1 = df[(df["Column2"] == 1) & (df["Column3"] == "some string")] # Multiple-column filtering
 
+# Every filter above scans the whole column. If you look up the same column
+# many times, make it the index instead. A sorted index is searched with
+# binary search (O(log n)) and exact lookups use a hash table (O(1))
+indexed_df = df.set_index("Column2").sort_index()
+indexed_df.loc[2]         # Rows where Column2 == 2
+indexed_df.loc[2:3]       # Rows where 2 <= Column2 <= 3 (both ends included!)
+# The index is kept when adding new columns, so it doesn't need rebuilding
+indexed_df["Column3"] = "some string"
+# at[] is the fastest way to get or set a single value
+df.at[0, "Column1"]  # => Row1, same as df.loc[0, "Column1"]
+
 # Operating with values
 # Operations can be done to columns/Series, so they are applied to each value
 df["Column2"] * 5 # => [5, 10, 15]
@@ -973,6 +1070,16 @@ df_1 = df_1.drop(df_1.columns[-9:-5], axis=1)
 
 # apply() is a strong tool which accepts lambda functions
 df["Column2"].apply(lambda val: val > 2) # => [3]
+# But it calls the Python function once per value. Whenever the lambda is just
+# a comparison, use the vectorized operator instead, which is much faster
+df["Column2"] > 2  # => Same result as the apply() above
+# Predicates can be combined with & (and), | (or) and ~ (not). Remember the
+# parentheses, since & and | bind tighter than comparisons
+df[(df["Column2"] > 2) | ~df["Column2"].isin([1, 4])]
+# NumPy's where() works as a vectorized "if ... else" (more on NumPy in 5.2)
+import numpy as np
+np.where(df["Column2"] > 2, "big", "small")  # => ["small", "small", "big"]
+# Keep apply() for functions that cannot be expressed this way
 
 ####################################################
 ## 5.2 NumPy
@@ -1024,6 +1131,17 @@ np.sin(b)  # [0,1,0]
 np.linspace(0, 5, num=6)  # => [0,1,2,3,4,5]
 np.linspace(-2, 2, num=9)  # => [-2, -1.5, -1, -0.5. 0, 0.5, 1, 1.5, 2]
 
+# By default arrays use 64-bit types (float64, int64). Smaller types take half
+# the memory or less, and are therefore faster to process. Use dtype to choose
+np.linspace(0, 5, num=6, dtype=np.float32)
+small = np.array([0, 1, 2, 3, 4], dtype=np.int16)
+small.nbytes  # => 10, instead of 40 with int64
+# But be careful: small integer types silently wrap around when they overflow
+small * 10000  # => [0, 10000, 20000, 30000, -25536]
+np.iinfo(np.int16).max  # => 32767, the biggest value an int16 can hold
+# Operations between different types are upcast to the bigger one
+(small + np.array([1], dtype=np.int64)).dtype  # => dtype('int64')
+
 
 # Arrays can be 2-Dimensional as well
 array = np.array([[11, 12, 13], [21, 22, 23], [31, 32, 33]])
@@ -1041,6 +1159,58 @@ x = np.array([[0, 1, 1], [1, 0, 1]])
 y = np.array([[1, 1], [1, 1], [-1, 1]])
 # since x's rows must equal y's columns
 mult = np.dot(x, y)  # => [[0,0], [0,2]]
+mult = x @ y         # => Same thing, using the matrix multiplication operator
+
+# To multiply many small matrices, don't loop over them in Python. Stack them
+# in a 3-D array and let matmul multiply them all in a single call
+xs = np.random.rand(1000, 2, 3)  # 1000 matrices of 2x3
+ys = np.random.rand(1000, 3, 2)  # 1000 matrices of 3x2
+mults = np.matmul(xs, ys)        # => shape (1000, 2, 2)
+mults = np.einsum("nij,njk->nik", xs, ys)  # Same, with Einstein notation
+
+# Big products are handed over to a BLAS library, which uses several threads.
+# The thread count can be limited with the threadpoolctl module
+# (pip install threadpoolctl), e.g. when running many processes at once
+from threadpoolctl import threadpool_limits
+with threadpool_limits(limits=1, user_api="blas"):
+    np.dot(xs[0], ys[0])
+
+# Matrix products take 2*n^3 floating-point operations, so you can measure
+# how fast your machine is in GFLOP/s
+n = 2000
+big = np.random.rand(n, n).astype(np.float32)  # float32 is roughly 2x faster
+seconds = timeit.timeit(lambda: big @ big, number=3) / 3
+print("{:.1f} GFLOP/s".format(2 * n**3 / seconds / 1e9))
+
+# Arrays can be saved to disk in NumPy's own binary format (.npy) instead of
+# being rebuilt from Python lists every time
+np.save("array.npy", array)
+array = np.load("array.npy")
+# With mmap_mode the file is not read into memory. Instead, its pages are
+# loaded only when accessed, and shared between every process opening it,
+# so opening even a huge array is almost instant and costs no extra RAM
+array = np.load("array.npy", mmap_mode="r")   # "r" is read-only, "r+" to edit
+array[1, 2]  # => 23, only this part of the file is actually read
+
+# np.memmap creates a new array directly on disk, which can be filled in parts
+on_disk = np.memmap("big.dat", dtype=np.float32, mode="w+", shape=(10000, 10000))
+on_disk[:100] = 1.0
+on_disk.flush()  # Writes pending changes to the file
+
+# Universal functions and reductions can then be run block by block, so that
+# only one block is in memory at a time. np.sin() can write each result
+# straight into another memory-mapped array with the out argument
+result = np.memmap("sin.dat", dtype=np.float32, mode="w+", shape=on_disk.shape)
+block = 1000
+total, biggest = 0.0, -np.inf
+for start in range(0, on_disk.shape[0], block):
+    chunk = on_disk[start:start + block]
+    np.sin(chunk, out=result[start:start + block])
+    # Sum in float64 to avoid losing precision over many blocks.
+    # NumPy's sum() already uses pairwise summation within each block
+    total += chunk.sum(dtype=np.float64)
+    biggest = max(biggest, chunk.max())
+mean = total / on_disk.size  # Same as on_disk.mean(), without loading it all
 
 ####################################################
 ## 5.3 Keras
@@ -1057,6 +1227,10 @@ class Human:
     # A class attribute. It is shared by all instances of this class
     species = "H. sapiens"
 
+    # Where say() writes to. None means the screen (sys.stdout), but it can be
+    # any object with a write() method. See 7. File Management
+    output = None
+
     # Basic initializer, this is called when this class is instantiated.
     # Note that the double leading and trailing underscores denote objects
     # or attributes that are used by Python but that live in user-controlled
@@ -1073,7 +1247,8 @@ class Human:
 
     # An instance method. All methods take "self" as the first argument
     def say(self, msg):
-        print("{name}: {message}".format(name=self.name, message=msg))
+        print("{name}: {message}".format(name=self.name, message=msg),
+              file=self.output)
 
     # Another instance method
     def sing(self):
@@ -1171,6 +1346,18 @@ print(r == s) # => True, they have the same value
 from human import Human
 
 
+# Many heroes have exactly the same superpowers. Instead of each of them
+# having its own copy, this pool keeps a single tuple for each set of powers,
+# and gives the same one to every hero asking for it. Tuples are immutable,
+# so sharing them is safe, unlike with lists
+superpowers_pool = {}
+
+def intern_superpowers(superpowers):
+    superpowers = tuple(superpowers)
+    # setdefault() returns the stored tuple, adding this one if there was none
+    return superpowers_pool.setdefault(superpowers, superpowers)
+
+
 # Specify the parent class(es) as parameters to the class definition
 class Superhero(Human):
 
@@ -1188,13 +1375,14 @@ class Superhero(Human):
     # This constructor inherits the "name" argument from the "Human" class and
     # adds the "superpower" and "movie" arguments:
     def __init__(self, name, movie=False,
-                 superpowers=["super strength", "bulletproofing"]):
+                 superpowers=("super strength", "bulletproofing")):
 
         # add additional class attributes:
         self.fictional = True
         self.movie = movie
-        # be aware of mutable default values, since defaults are shared
-        self.superpowers = superpowers
+        # be aware of mutable default values, since defaults are shared.
+        # That's why the default is a tuple and not a list
+        self.superpowers = intern_superpowers(superpowers)
 
         # The "super" function lets you access the parent class's methods
         # that are overridden by the child, in this case, the __init__ method.
@@ -1208,7 +1396,8 @@ class Superhero(Human):
     # add an additional instance method
     def boast(self):
         for power in self.superpowers:
-            print("I wield the power of {pow}!".format(pow=power))
+            print("I wield the power of {pow}!".format(pow=power),
+                  file=self.output)
 
 
 if __name__ == '__main__':
@@ -1245,6 +1434,19 @@ if __name__ == '__main__':
     # Attribute that only exists within Superhero
     print('Am I Oscar eligible? ' + str(sup.movie))
 
+    # Heroes with the same superpowers share a single tuple
+    hero = Superhero("Clark", superpowers=["super strength", "flight"])
+    other_hero = Superhero("Kara", superpowers=["super strength", "flight"])
+    hero.superpowers is other_hero.superpowers  # => True
+
+    # Which you can check with tracemalloc
+    import tracemalloc
+    tracemalloc.start()
+    heroes = [Superhero("Tick", superpowers=["super strength", "flight"])
+              for i in range(100000)]
+    tracemalloc.get_traced_memory()  # => ~12 MB, instead of ~19 MB with a list per hero
+    tracemalloc.stop()
+
 ####################################################
 ## 6.2 Multiple Inheritance
 ####################################################
@@ -1298,6 +1500,19 @@ class Batman(Superhero, Bat):
     def sing(self):
         return 'nan nan nan nan nan batman!'
 
+    # Every Batman() ends up with exactly the same attributes, but __init__
+    # has to go through Superhero, Human and Bat to set them, and even sets
+    # the name twice. A class method can work as a faster alternative
+    # constructor: it builds a Batman once, keeps a copy of its attributes
+    # (its __dict__) as a template, and copies it into every new object
+    @classmethod
+    def create(cls):
+        if "_template" not in cls.__dict__:
+            cls._template = dict(vars(cls()))
+        batman = cls.__new__(cls)  # Creates the object without calling __init__
+        batman.__dict__.update(cls._template)
+        return batman
+
 
 if __name__ == '__main__':
     sup = Batman()
@@ -1328,6 +1543,198 @@ if __name__ == '__main__':
     # Inherited attribute from 2nd ancestor whose default value was overridden.
     print('Can I fly? ' + str(sup.fly)) # => Can I fly? False
 
+    # The fast constructor gives identical objects
+    vars(Batman.create()) == vars(Batman())  # => True
+    # And we can count how many objects each class creates per second
+    for create in (lambda: Human("Ian"), lambda: Superhero("Tick"),
+                   Batman, Batman.create):
+        print(int(10**5 / timeit.timeit(create, number=10**5)))
+        # => ~2M/s, ~1M/s, ~0.4M/s and ~1M/s respectively
+
+
+####################################################
+## 6.3 Saving memory with __slots__
+####################################################
+
+# Every instance stores its attributes in its own dictionary, __dict__, which
+# takes quite a lot of memory. If a class will have millions of instances,
+# list its attributes in __slots__ and they will be stored compactly instead.
+# The downside is that no other attributes can be added to the instances.
+# Every class in the hierarchy must define __slots__, otherwise instances get
+# a __dict__ anyway, so we can't just subclass Human
+class SlottedHuman:
+    # Only attributes set on the instance go here
+    __slots__ = ("name", "_age")
+    species = "H. sapiens"
+    output = None
+
+    # Methods are just functions stored in the class, so they can be reused
+    __init__ = Human.__init__
+    say = Human.say
+    sing = Human.sing
+    age = Human.age  # Properties too
+    # Getting them from __dict__ keeps them as classmethod/staticmethod objects
+    get_species = Human.__dict__["get_species"]
+    grunt = Human.__dict__["grunt"]
+
+
+class SlottedSuperhero(SlottedHuman):
+    # Child classes only list the attributes they add
+    __slots__ = ("fictional", "movie", "superpowers")
+    species = "Superhuman"
+
+    def __init__(self, name, movie=False,
+                 superpowers=("super strength", "bulletproofing")):
+        self.fictional = True
+        self.movie = movie
+        self.superpowers = intern_superpowers(superpowers)
+        super().__init__(name)
+
+    sing = Superhero.sing
+    boast = Superhero.boast
+
+
+# Only one of the parents of a class can have non-empty __slots__, or Python
+# raises "TypeError: multiple bases have instance lay-out conflict". So
+# SlottedBat leaves its slots empty, and it is up to its child classes to
+# declare "fly" (it can only be used as a parent class)
+class SlottedBat:
+    __slots__ = ()
+    species = "Baty"
+
+    __init__ = Bat.__init__
+    say = Bat.say
+    sonar = Bat.sonar
+
+
+class SlottedBatman(SlottedSuperhero, SlottedBat):
+    __slots__ = ("fly",)
+
+    def __init__(self, *args, **kwargs):
+        SlottedSuperhero.__init__(self, 'anonymous', movie=True,
+                                  superpowers=('Wealthy',), *args, **kwargs)
+        SlottedBat.__init__(self, *args, can_fly=False, **kwargs)
+        self.name = 'Sad Affleck'
+
+    sing = Batman.sing
+
+if __name__ == '__main__':
+    import sys
+
+    human, slotted_human = Human("Ian"), SlottedHuman("Ian")
+    sys.getsizeof(human) + sys.getsizeof(human.__dict__)  # => ~300 bytes
+    sys.getsizeof(slotted_human)                          # => 48 bytes
+    # slotted_human.height = 180  # => AttributeError, "height" isn't a slot
+
+    # The slotted classes behave just like the originals
+    bruce = SlottedBatman()
+    print(bruce.get_species())  # => Superhuman
+    bruce.say('I agree')        # => Sad Affleck: I agree
+    print(bruce.sonar())        # => ))) ... (((
+    bruce.age = 100
+    print(bruce.age)            # => 100
+    print(hasattr(bruce, "__dict__"))  # => False
+
+
+####################################################
+## 6.4 Struct of arrays
+####################################################
+
+# When there are lots of objects of the same class, another option is to turn
+# the list of objects around: instead of a list of Humans, each with a name
+# and an age, keep one NumPy array with all the names and another with all the
+# ages. This is known as "struct of arrays", and allows operating on everyone
+# at once, like we saw in the NumPy section
+class HumanTable:
+
+    # classes and extras are used to turn rows back into the original objects
+    def __init__(self, names, ages, species, classes, extras):
+        self.names = np.array(names, dtype=object)
+        self.ages = np.array(ages, dtype=np.int32)
+        self.species = np.array(species, dtype=object)
+        self.classes = np.array(classes, dtype=object)  # Human, Superhero...
+        self.extras = np.array(extras, dtype=object)    # Other attributes
+
+    # Converting from and to a list of Humans
+    @classmethod
+    def from_humans(cls, humans):
+        return cls([human.name for human in humans],
+                   [human.age for human in humans],
+                   [human.get_species() for human in humans],
+                   [type(human) for human in humans],
+                   [{key: value for key, value in vars(human).items()
+                     if key not in ("name", "_age")} for human in humans])
+
+    def to_humans(self):
+        humans = []
+        for name, age, cls, extra in zip(self.names, self.ages, self.classes,
+                                         self.extras):
+            # Like Batman.create(): build the object without calling __init__,
+            # since each class takes different arguments, and fill it in
+            human = cls.__new__(cls)
+            human.__dict__.update(extra)
+            human.name = name
+            human.age = int(age)
+            humans.append(human)
+        return humans
+
+    # These special methods make len(table) and table[i] work
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return HumanRow(self, index)
+
+    # Filters take an array of booleans (a mask), e.g. table.ages > 18
+    def filter(self, mask):
+        return HumanTable(self.names[mask], self.ages[mask], self.species[mask],
+                          self.classes[mask], self.extras[mask])
+
+    def count_by_species(self):
+        species, counts = np.unique(self.species.astype(str), return_counts=True)
+        return dict(zip(species.tolist(), counts.tolist()))
+
+
+# A row view behaves like a Human, but reads and writes the table's arrays
+class HumanRow:
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self):
+        return self.table.names[self.index]
+
+    @property
+    def age(self):
+        return int(self.table.ages[self.index])
+
+    @age.setter
+    def age(self, age):
+        self.table.ages[self.index] = age
+
+    def get_species(self):
+        return self.table.species[self.index]
+
+    # The methods of Human only use self.name and self.output, so they can be
+    # reused
+    output = None
+    say = Human.say
+    sing = Human.sing
+
+
+if __name__ == '__main__':
+    people = HumanTable.from_humans([Human("Ian"), Human("Joel"), Superhero("Tick")])
+    people.ages += 1                  # Everyone is a year older, no loop needed
+    people[0].say("hi")               # => "Ian: hi"
+    people[0].age                     # => 1
+    people.filter(people.ages > 0)    # => All 3 of them
+    # Remember that Human.species was changed to "H. neanderthalensis" above
+    people.count_by_species()         # => {"H. neanderthalensis": 2, "Superhuman": 1}
+    people.to_humans()                # => [Human, Human, Superhero]
+
 
 
 ####################################################
@@ -1371,6 +1778,280 @@ with open("filename", "mode", "encoding") as f:
 # To relocate the pointer to a specific position, use seek()
     f.seek(0) # Returns to first character
 
+# Writing to the screen works like writing to a file, and every print() is
+# a separate, slow, write. If you print a lot, it is much faster to collect
+# the output and write it in big batches. print() accepts a file argument for
+# this, which is why Human.say() writes to Human.output
+import io
+import sys
+
+# io.StringIO is a file that lives in memory. Useful to collect (or test) output
+Human.output = io.StringIO()
+Human("Ian").say("hi")
+Human.output.getvalue()  # => "Ian: hi\n"
+
+# open() can also take the number of the screen's file descriptor (fileno),
+# and a buffer size. Then output is only written when the buffer is full
+Human.output = open(sys.stdout.fileno(), "w", buffering=1024 * 1024,
+                    closefd=False)  # Don't close the screen when closing this
+for i in range(10000):
+    Human("Ian").say(i)
+Human.output.flush()  # Writes whatever is left in the buffer. Don't forget it!
+
+# Superhero.boast() inherits the output too
+Superhero.output = open("boasts.txt", "w", buffering=1024 * 1024)
+Superhero("Tick").boast()  # Written to boasts.txt, once the buffer fills up
+Superhero.output.close()   # Closing also flushes
+Human.output = Superhero.output = None  # Back to the screen, one line at a time
+
+# Compare messages per second, writing to a file on disk
+with open("line_buffered.txt", "w", buffering=1) as line_buffered, \
+        open("buffered.txt", "w", buffering=1024 * 1024) as buffered:
+    for output in (line_buffered, buffered):
+        seconds = timeit.timeit(lambda: print("Ian: hi", file=output),
+                                number=10**5)
+        print(int(10**5 / seconds))  # => ~0.5M/s line by line, ~2M/s buffered
+
+# Reading can also be sped up with bigger buffers. Looping over a file reads
+# it line by line, without loading it all in memory like readlines() does.
+# Binary mode ("rb") skips decoding the text, which is faster too
+with open("myfile.txt", "rb", buffering=1024 * 1024) as f:
+    for line in f:
+        pass  # line is a bytes object, e.g. b"first line\n"
+
+# mmap (memory-map) makes a file look like a big bytes object, reading its
+# contents from disk only when they are accessed. A memoryview of it can be
+# sliced without copying any data
+import mmap
+
+def mmap_lines(path):
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        line = None
+        # The file can't be closed while any view of it is in use. finally
+        # also runs when the loop using this generator stops early (break)
+        try:
+            start = 0
+            while start < len(mapped):
+                end = mapped.find(b"\n", start)
+                if end == -1:  # The last line may not end with a newline
+                    end = len(mapped) - 1
+                line = view[start:end + 1]
+                yield line
+                line.release()
+                start = end + 1
+        finally:
+            if line is not None:
+                line.release()  # Releasing twice is fine
+            view.release()
+
+# NOTE: each slice is only valid until the next one is read, so use
+# bytes(line) to keep a copy of it. Also, empty files can't be mapped
+for line in mmap_lines("myfile.txt"):
+    line.tobytes()  # => b"first line\n"
+
+# To compare them, measure how many GB per second each one reads
+import os
+import time
+
+def gigabytes_per_second(read_function, path):
+    start = time.perf_counter()
+    for line in read_function(path):
+        pass
+    return os.path.getsize(path) / (time.perf_counter() - start) / 1e9
+
+# Generators with a with statement inside, so files are closed when done
+def text_lines(path):
+    with open(path) as f:
+        yield from f  # Yields every line of f
+
+def buffered_lines(path):
+    with open(path, "rb", buffering=1024 * 1024) as f:
+        yield from f
+
+gigabytes_per_second(text_lines, "myfile.txt")      # => ~0.4 GB/s
+gigabytes_per_second(buffered_lines, "myfile.txt")  # => ~0.7 GB/s
+gigabytes_per_second(mmap_lines, "myfile.txt")      # => ~0.1 GB/s
+# Surprised? Searching for each newline in Python code costs more than mmap
+# saves. mmap shines when jumping around a big file (mapped[1000:2000]) or
+# processing it in big blocks, not when going line by line
+
+# When writing lots of small records, opening the file for each one (like in
+# section 3) is very slow. It is better to keep the file open, collect the
+# records in a list, and write them all together every so often.
+# Writing to a temporary file and renaming it once finished also makes the
+# write atomic: anyone reading the file sees either the old or the new
+# version, never a half-written one
+import json
+import uuid
+
+class BatchWriter:
+
+    # fsync can be "never", "batch" (after every batch) or "close". fsync makes
+    # sure the data is really on the disk, and not just in the OS's memory,
+    # which is safer in case of a crash, but slow. Unless it is "never", the
+    # folder is also fsynced after the rename, so the rename itself is saved
+    def __init__(self, path, batch_size=10000, fsync="close"):
+        self.path = path
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.records = []
+        self.written = 0
+        self.fsyncs = 0
+
+    # __enter__ and __exit__ are what make a class usable in a with statement
+    def __enter__(self):
+        self.start = time.perf_counter()
+        # The temporary file must be in the same folder for the rename to work
+        self.folder = os.path.dirname(os.path.abspath(self.path))
+        self.temp_path = os.path.join(self.folder, ".{}.{}.tmp".format(
+            os.path.basename(self.path), uuid.uuid4().hex))
+        # os.open() creates it with the usual permissions for new files (0o666
+        # minus those removed by the umask). O_EXCL fails if it already exists
+        fd = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        self.file = os.fdopen(fd, "w")  # Turns it into a normal file object
+        return self
+
+    def write(self, record):
+        self.records.append(record)
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        self.file.writelines(self.records)
+        self.written += len(self.records)
+        self.records = []
+        if self.fsync == "batch":
+            self._fsync()
+
+    def _fsync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.fsyncs += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:  # Something failed: keep the old file intact
+            self.file.close()
+            os.remove(self.temp_path)
+            return
+        self.flush()  # With fsync="batch", this already fsyncs
+        if self.fsync == "close":
+            self._fsync()
+        self.file.close()
+        # Keep the permissions of the file being replaced, if there is one
+        if os.path.exists(self.path):
+            os.chmod(self.temp_path, os.stat(self.path).st_mode & 0o777)
+        os.replace(self.temp_path, self.path)  # Atomic rename
+        if self.fsync != "never":
+            # The rename is stored in the folder, so fsync it too. Opening
+            # folders like this works on Linux and macOS, but not on Windows
+            folder_fd = os.open(self.folder, os.O_RDONLY)
+            try:
+                os.fsync(folder_fd)
+            finally:
+                os.close(folder_fd)
+            self.fsyncs += 1
+        seconds = time.perf_counter() - self.start
+        print("{:.0f} records/s, {:.1f} fsyncs/s".format(
+            self.written / seconds, self.fsyncs / seconds))
+
+
+with BatchWriter("myfile2.txt") as writer:
+    for i in range(10**6):
+        writer.write(json.dumps({"aa": i, "bb": 21}) + "\n")
+# => ~300000 records/s, ~0.6 fsyncs/s (the file and the folder, when closing)
+
+# Notice how each record above was written as a JSON object in its own line.
+# This is called NDJSON (Newline Delimited JSON), or JSON Lines. Unlike
+# json.load(), which parses the whole file at once, it can be read one
+# object at a time, and new objects can be appended at the end
+# orjson (pip install orjson) is much faster than json, so use it if installed
+decoders = [json.loads]  # Every decoder available, to compare them below
+try:
+    import orjson
+
+    decoders.append(orjson.loads)
+
+    def to_json_line(obj):
+        return orjson.dumps(obj) + b"\n"  # orjson works with bytes
+
+    from_json = orjson.loads
+except ImportError:
+    def to_json_line(obj):
+        return (json.dumps(obj) + "\n").encode("utf-8")
+
+    from_json = json.loads
+
+
+# The decoder can be chosen with the loads argument
+def read_json_lines(path, loads=from_json):
+    with open(path, "rb", buffering=1024 * 1024) as f:
+        for line in f:
+            if line.strip():  # Skip empty lines
+                yield loads(line)
+
+
+def append_json_lines(path, objects):
+    with open(path, "ab") as f:  # "a" appends to the end of the file
+        f.writelines(to_json_line(obj) for obj in objects)
+
+
+append_json_lines("myfile3.txt", [{"aa": 12, "bb": 21}, {"aa": 13, "bb": 22}])
+for contents in read_json_lines("myfile3.txt"):
+    print(contents)  # => {"aa": 12, "bb": 21}, then {"aa": 13, "bb": 22}
+
+# Compare the decoders on a big file (only json if orjson isn't installed)
+for loads in decoders:
+    seconds = timeit.timeit(
+        lambda: sum(1 for _ in read_json_lines("myfile2.txt", loads)), number=1)
+    print(loads.__module__, seconds)  # => orjson is usually several times faster
+
+# In section 3, myfile1.txt was written with str(contents), which can only be
+# read back as a string. ast.literal_eval() can turn it back into a dict
+# safely (never use eval() for this!), but it's slow. When all records have
+# the same fields (a schema), the struct module can store them in binary
+# form, taking just the bytes needed for each value
+import ast
+import struct
+
+SCHEMA = ("aa", "bb")
+RECORD = struct.Struct("<ii")  # 2 little-endian ("<") 4-byte ints ("i")
+
+def encode_record(record):
+    return RECORD.pack(*(record[field] for field in SCHEMA))
+
+def decode_record(data):
+    return dict(zip(SCHEMA, RECORD.unpack(data)))
+
+contents = {"aa": 12, "bb": 21}
+with open("myfile1.bin", "wb") as file:  # Binary mode
+    file.write(b"".join(encode_record({"aa": i, "bb": 21}) for i in range(1000)))
+
+# Since every record has the same size, we can jump straight to any of them
+with open("myfile1.bin", "rb") as file:
+    file.seek(500 * RECORD.size)
+    decode_record(file.read(RECORD.size))  # => {"aa": 500, "bb": 21}
+    file.seek(0)
+    # iter_unpack() decodes all of them in one go
+    records = [dict(zip(SCHEMA, values))
+               for values in RECORD.iter_unpack(file.read())]
+
+# Comparing sizes...
+len(str(contents))             # => 20 bytes
+len(json.dumps(contents))      # => 20 bytes
+len(encode_record(contents))   # => 8 bytes
+# ...and the time to encode and decode a record 100000 times
+timeit.timeit(lambda: ast.literal_eval(str(contents)), number=10**5)  # => ~1.8 s
+timeit.timeit(lambda: json.loads(json.dumps(contents)), number=10**5) # => ~0.5 s
+timeit.timeit(lambda: decode_record(encode_record(contents)),
+              number=10**5)                                           # => ~0.15 s
+
+# If records don't share a schema, msgpack (pip install msgpack) is a compact
+# binary alternative to JSON: msgpack.packb(contents), msgpack.unpackb(data)
+
 
 ####################################################
 ## 8. Advanced
@@ -1428,6 +2109,103 @@ import itertools
 somelists = [[1, 2, 3],['a', 'b'],[4, 5]]
 list(itertools.product(*somelists))
 
+# itertools also helps build lazy pipelines out of generators.
+# islice() takes only the first n values, without creating a list
+list(itertools.islice(double_numbers(range(1, 900000000)), 3))  # => [2, 4, 6]
+
+# A generator only runs on one CPU core. To use all of them, split the values
+# into batches and send them to a pool of processes
+def batched(iterable, size):  # Included as itertools.batched in Python 3.12+
+    iterator = iter(iterable)
+    batch = list(itertools.islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, size))
+
+def double_batch(batch):
+    return list(double_numbers(batch))
+
+from multiprocessing import Pool
+
+# A generator that works like double_numbers, but in several processes
+def parallel_double_numbers(iterable, processes=4, batch_size=10000):
+    with Pool(processes=processes) as pool:
+        batches = batched(iterable, batch_size)
+        # Only take a few batches at a time, so that memory usage stays
+        # bounded. pool.map() returns the results in the same order as the input
+        window = list(itertools.islice(batches, processes))
+        while window:
+            for result in pool.map(double_batch, window):
+                yield from result  # Yields each value of result
+            window = list(itertools.islice(batches, processes))
+
+# On Windows and macOS, each worker process starts by importing this file,
+# running every top-level statement again, except those inside this check.
+# In a file like this one, that's almost everything (the big files and arrays
+# in other sections included), so in real code, keep the functions given to
+# a Pool in a small module of their own
+if __name__ == '__main__':
+    for i in parallel_double_numbers(range(1, 900000000)):
+        print(i)
+        if i >= 30:
+            break  # Stops the generator, which closes the pool
+    # islice() can bound it too, e.g. to the first million numbers
+    sum(parallel_double_numbers(itertools.islice(range(1, 900000000), 10**6)))
+
+# Yielding values one by one has a cost for each value. Generators can yield
+# whole NumPy arrays instead, so the work on each block is vectorized
+def double_number_blocks(start, stop, block=100000):
+    for block_start in range(start, stop, block):
+        i = np.arange(block_start, min(block_start + block, stop))
+        yield i + i  # Doubles the whole block at once
+
+# The blocks can still be consumed value by value when a later step needs it
+one_by_one = itertools.chain.from_iterable(double_number_blocks(1, 900000000))
+next(one_by_one)  # => 2
+
+# Summing the whole range this way takes seconds instead of minutes
+timeit.timeit(lambda: sum(block.sum() for block in double_number_blocks(1, 10**7)),
+              number=1)  # => ~0.05 s
+timeit.timeit(lambda: sum(double_numbers(range(1, 10**7))), number=1)  # => ~0.6 s
+
+# Generators can also be asynchronous, which is useful when getting each value
+# means waiting for I/O (files, network...). While one value is awaited,
+# other tasks can keep running
+import asyncio
+
+async def fetch(i):
+    await asyncio.sleep(0.1)  # Stands in for a slow network request
+    return i
+
+async def async_double_numbers(async_iterable):
+    async for i in async_iterable:  # "async for" loops over async iterables
+        yield i + i
+
+async def numbers(n):
+    for i in range(n):
+        yield await fetch(i)
+
+# A semaphore limits how many requests run at the same time
+async def amap(function, values, concurrency=10):
+    semaphore = asyncio.Semaphore(concurrency)
+    async def limited(value):
+        async with semaphore:
+            return await function(value)
+    # gather() runs them all concurrently and keeps the order of the results
+    return await asyncio.gather(*(limited(value) for value in values))
+
+async def main():
+    # Async generator comprehensions work too
+    doubled = [i async for i in async_double_numbers(numbers(5))]  # ~0.5 s
+    results = await amap(fetch, range(100))  # ~1 s instead of 10 s
+    # Tasks can be cancelled, e.g. if they take too long
+    try:
+        await asyncio.wait_for(fetch(1), timeout=0.01)
+    except asyncio.TimeoutError:
+        print("Cancelled!")
+
+asyncio.run(main())
+
 
 # Decorators
 # In this example `beg` wraps `say`. If say_please is True then it
@@ -1453,6 +2231,183 @@ def say(say_please=False):
 print(say())                 # Can you buy me a beer?
 print(say(say_please=True))  # Can you buy me a beer? Please! I am poor :(
 
+# functools includes a very useful decorator, lru_cache, which remembers the
+# results of a function (memoization). It only makes sense for pure functions,
+# whose result depends only on their arguments (and without side effects)
+from functools import lru_cache
+
+@lru_cache(maxsize=1024)  # Keeps the 1024 most recently used results
+def create_cached_adder(x):
+    return create_adder(x)
+
+create_cached_adder(10) is create_cached_adder(10)  # => True, same adder
+create_cached_adder.cache_info()  # => CacheInfo(hits=1, misses=1, maxsize=1024, currsize=1)
+create_cached_adder.cache_clear()  # Empties the cache
+
+# We can write our own caching decorators in the same way as beg, e.g. one
+# whose results expire after some time (TTL, Time To Live)
+import time
+import threading
+
+def ttl_cache(seconds, maxsize=1024):
+    def decorator(target_function):
+        cache = {}
+        lock = threading.Lock()  # So it can be used from several threads
+        stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        @wraps(target_function)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                if args in cache:
+                    if cache[args][1] > now:
+                        stats["hits"] += 1
+                        return cache[args][0]
+                    del cache[args]  # It expired
+                    stats["evictions"] += 1
+                stats["misses"] += 1
+            result = target_function(*args)
+            with lock:
+                # Another thread may have stored it meanwhile. Remove it first,
+                # so that we don't evict another entry to make room for it
+                cache.pop(args, None)
+                if len(cache) >= maxsize:
+                    # Dicts keep insertion order, so this is the oldest entry
+                    del cache[next(iter(cache))]
+                    stats["evictions"] += 1
+                cache[args] = (result, now + seconds)
+            return result
+
+        wrapper.stats = stats  # Functions are objects, so they can have attributes
+        return wrapper
+
+    return decorator
+
+
+@ttl_cache(seconds=60)
+def slow_square(x):
+    time.sleep(1)
+    return x * x
+
+slow_square(4)     # => 16, after 1 second
+slow_square(4)     # => 16, instantly
+slow_square.stats  # => {"hits": 1, "misses": 1, "evictions": 0}
+
+# Every decorator adds an extra function call, and packing/unpacking *args and
+# **kwargs on each call. For tiny functions that are called very often, this
+# can take longer than the function itself. If you know the signature of the
+# decorated function, you can write a wrapper with the exact same parameters
+def beg_fast(target_function):
+    @wraps(target_function)
+    def wrapper(say_please=False):
+        msg, say_please = target_function(say_please)
+        if say_please:
+            return msg + " Please! I am poor :("
+        return msg
+
+    return wrapper
+
+# Stacking several decorators adds one call per decorator. Instead, a single
+# wrapper can apply several steps to the result, one after the other. It still
+# uses *args and **kwargs so it works for any function, but that cost is now
+# paid once per call, instead of once per decorator
+def pipe(*steps):
+    def decorator(target_function):
+        @wraps(target_function)
+        def wrapper(*args, **kwargs):
+            result = target_function(*args, **kwargs)
+            for step in steps:
+                result = step(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# Steps run from left to right, so this is the same as stacking @strip on top
+# of @upper (stacked decorators apply to the result from the bottom up)
+@pipe(str.upper, str.strip)
+def shout(msg):
+    return msg + "  "
+
+shout("hi")  # => "HI"
+
+# Measure the cost per call with timeit
+def plain_say(say_please=False):
+    return "Can you buy me a beer?", say_please
+
+timeit.timeit(plain_say, number=10**6)            # => ~0.10 s
+timeit.timeit(beg(plain_say), number=10**6)       # => ~0.30 s
+timeit.timeit(beg_fast(plain_say), number=10**6)  # => ~0.15 s
+
+# Decorators are also a handy way to measure where a program spends its time.
+# This one stores how long each call took in a global registry
+import json
+import statistics
+from collections import deque
+
+# function name => {"calls": how many times it was called,
+#                   "durations": how long its most recent calls took}
+# A deque with a maxlen drops the oldest values when full, so memory stays
+# bounded however many calls there are
+TIMINGS = {}
+TIMING_ENABLED = True
+TIMING_SAMPLES = 10000
+
+def timed(target_function):
+    # When disabled, the function is returned as is, so there is no cost at all
+    if not TIMING_ENABLED:
+        return target_function
+    stats = TIMINGS.setdefault(target_function.__qualname__, {
+        "calls": 0, "durations": deque(maxlen=TIMING_SAMPLES)})
+
+    @wraps(target_function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return target_function(*args, **kwargs)
+        finally:  # Also measures calls that raise an exception
+            stats["durations"].append(time.perf_counter() - start)
+            stats["calls"] += 1
+
+    return wrapper
+
+
+def timings_report():
+    report = {}
+    for name, stats in TIMINGS.items():
+        report[name] = {"calls": stats["calls"]}
+        if len(stats["durations"]) < 2:  # Too few to compute percentiles
+            continue
+        # Percentiles of the most recent calls, in seconds. "inclusive" keeps
+        # them within the measured values, even with few samples
+        percentiles = statistics.quantiles(stats["durations"], n=100,
+                                           method="inclusive")
+        report[name]["p50"] = percentiles[49]
+        report[name]["p99"] = percentiles[98]
+    return json.dumps(report, indent=2)
+
+
+@timed
+def timed_swap(x, y):
+    return y, x
+
+for i in range(1000):
+    timed_swap(1, 2)
+print(timings_report())  # => {"timed_swap": {"calls": 1000, "p50": ..., "p99": ...}}
+
+# To find out how much memory is being allocated, use tracemalloc
+import tracemalloc
+tracemalloc.start()
+big_list = list(range(10**6))
+current, peak = tracemalloc.get_traced_memory()  # => in bytes
+tracemalloc.stop()
+
+# And for a full picture of which functions take the longest, use cProfile
+import cProfile
+cProfile.run("sum(double_numbers(range(10**6)))")
+
 ####################################################
 ## 9. Testing
 ####################################################